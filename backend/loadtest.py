@@ -0,0 +1,426 @@
+"""Load-test harness that replays a realistic traffic mix against the API.
+
+Generates synthetic replays, drives a weighted mix of uploads and reads from
+concurrent workers, and reports per-endpoint throughput, latency percentiles,
+error rates and DB connection usage.
+
+Usage:
+    python loadtest.py --start-app --seed-uploads 20 --duration 60 --concurrency 32
+    python loadtest.py --base-url http://localhost:8000 --mix upload=1,profile=5 --json report.json
+
+The database is the one configured through DATABASE_* (see db.py); it must
+have the schema and migrations applied. DB connection counts are read from
+MySQL's global status counters with the same settings.
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+logging.basicConfig(level=logging.INFO)
+
+ENDPOINTS = ("upload", "battles", "battle", "users", "profile", "trend", "clans")
+DEFAULT_MIX = "upload=1,battles=2,battle=3,users=2,profile=4,trend=1,clans=1"
+MAPS = ["Himmelsdorf", "Prokhorovka", "Ensk", "Malinovka", "Lakeville", "Murovanka", "Cliff", "Steppes"]
+VEHICLE_TYPES = [1, 17, 33, 49, 257, 273, 289, 513, 529, 545, 769, 785, 1025, 1041, 1057]
+
+
+class ReplayFactory:
+    def __init__(self, players: int = 300, clans: int = 10, seed: int = None):
+        """
+        Pool of synthetic players and clans that generated replays draw from,
+        so repeated uploads hit the same accounts like a real clan would.
+        """
+        self.random = random.Random(seed)
+        self.clans = [(500000000 + i, f"CL{i}") for i in range(clans)]
+        self.players = []
+        for i in range(players):
+            clan_id, clan_tag = self.random.choice(self.clans) if self.random.random() < 0.8 else (None, "")
+            self.players.append({
+                "account_id": 1000000 + i,
+                "name": f"LoadTester{i}",
+                "clanDBID": clan_id,
+                "clanAbbrev": clan_tag,
+            })
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def account_ids(self) -> list:
+        return [p["account_id"] for p in self.players]
+
+    def make_replay(self) -> bytes:
+        """
+        Build a minimal .wotreplay body the backend parser accepts: the first line holds
+        the metadata JSON object followed by the battle results, then binary replay data.
+        Names contain no whitespace because FileHandler strips it.
+        """
+        with self.lock:
+            self.counter += 1
+            arena_id = int(time.time() * 1000) * 100 + self.counter % 100
+        rnd = self.random
+        roster = rnd.sample(self.players, min(30, len(self.players)))
+        map_name = rnd.choice(MAPS)
+        players = {}
+        vehicles = {}
+        for idx, player in enumerate(roster):
+            players[str(player["account_id"])] = {
+                "name": player["name"],
+                "clanDBID": player["clanDBID"],
+                "clanAbbrev": player["clanAbbrev"],
+                "team": 1 if idx % 2 == 0 else 2,
+            }
+            shots = rnd.randint(0, 20)
+            hits = rnd.randint(0, shots)
+            pens = rnd.randint(0, hits)
+            vehicles[str(10000 + idx)] = [{
+                "accountDBID": player["account_id"],
+                "typeCompDescr": rnd.choice(VEHICLE_TYPES),
+                "shots": shots,
+                "directHits": hits,
+                "piercings": pens,
+                "damageDealt": pens * rnd.randint(150, 450),
+            }]
+        metadata = {
+            "playerName": roster[0]["name"],
+            "mapDisplayName": map_name,
+            "clientVersionFromXml": "loadtest",
+            "clientVersionFromExe": "loadtest",
+            "regionCode": "EU",
+            "serverName": "loadtest",
+        }
+        battle = {
+            "arenaUniqueID": arena_id,
+            "common": {"arenaCreateTime": int(time.time()) - rnd.randint(0, 90 * 86400)},
+            "players": players,
+            "vehicles": vehicles,
+        }
+        first_line = json.dumps(metadata, separators=(",", ":")) + json.dumps([battle], separators=(",", ":"))
+        return first_line.encode("utf-8") + b"\n" + os.urandom(256)
+
+
+class Recorder:
+    def __init__(self):
+        """Thread-safe collection of per-endpoint latencies and error counts."""
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+class DBMonitor:
+    def __init__(self, interval: float = 1.0):
+        """
+        Samples MySQL's Threads_connected while the test runs and tracks the
+        Connections counter, i.e. how many connections the app opened.
+        """
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.db = None
+        try:
+            from db import get_db
+            self.db = get_db()
+        except Exception as e:
+            logging.warning(f"[loadtest] DB monitoring disabled: {e}")
+
+    def status(self, name: str):
+        if not self.db:
+            return None
+        cur = self.db.cursor()
+        cur.execute("SHOW GLOBAL STATUS LIKE %s", (name,))
+        row = cur.fetchone()
+        return int(row[1]) if row else None
+
+    def connections_opened(self):
+        """Monotonic count of connections the server has accepted; the monitor itself reuses one."""
+        return self.status("Connections")
+
+    def start(self):
+        if not self.db:
+            return
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            value = self.status("Threads_connected")
+            if value is not None:
+                self.samples.append(value)
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        if not self.samples:
+            return {}
+        return {
+            "threads_connected_avg": round(sum(self.samples) / len(self.samples), 1),
+            "threads_connected_peak": max(self.samples),
+        }
+
+
+class LoadTest:
+    def __init__(self, base_url: str, factory: ReplayFactory, mix: dict, timeout: float = 30.0):
+        """Runs the weighted endpoint mix against `base_url`."""
+        self.base_url = base_url.rstrip("/")
+        self.factory = factory
+        self.mix = mix
+        self.timeout = timeout
+        self.recorder = Recorder()
+        self.battle_ids = []
+        self.clan_ids = [clan_id for clan_id, _ in factory.clans]
+        self.local = threading.local()
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def request(self, endpoint: str, method: str, path: str, record: bool = True, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        resp = None
+        try:
+            resp = self.session().request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            pass
+        if record:
+            self.recorder.record(endpoint, time.perf_counter() - start, ok)
+        return resp if ok else None
+
+    def run_operation(self, endpoint: str, record: bool = True):
+        rnd = random
+        if endpoint == "upload":
+            # Unique names: the app writes uploads to TEMP_UPLOAD_DIR under the client filename
+            filename = f"loadtest-{uuid.uuid4().hex}.wotreplay"
+            files = {"file": (filename, io.BytesIO(self.factory.make_replay()))}
+            resp = self.request(endpoint, "POST", "/upload-replay", record, files=files)
+            if resp is not None:
+                battle_id = resp.json().get("battle_id")
+                if battle_id:
+                    self.battle_ids.append(battle_id)
+        elif endpoint == "battles":
+            self.request(endpoint, "GET", "/battles", record)
+        elif endpoint == "battle":
+            if not self.battle_ids:
+                return self.run_operation("battles", record)
+            self.request(endpoint, "GET", f"/battles/{rnd.choice(self.battle_ids)}", record)
+        elif endpoint == "users":
+            self.request(endpoint, "GET", "/users", record)
+        elif endpoint == "profile":
+            self.request(endpoint, "GET", f"/users/{rnd.choice(self.factory.account_ids())}", record)
+        elif endpoint == "trend":
+            self.request(endpoint, "GET", f"/users/{rnd.choice(self.factory.account_ids())}/trend", record)
+        elif endpoint == "clans":
+            if rnd.random() < 0.5:
+                self.request(endpoint, "GET", "/clans", record)
+            else:
+                self.request(endpoint, "GET", f"/clans/{rnd.choice(self.clan_ids)}", record)
+        else:
+            raise ValueError(f"Unknown endpoint in mix: {endpoint}")
+
+    def seed(self, uploads: int):
+        """Upload `uploads` replays up front so reads have data to hit."""
+        for _ in range(uploads):
+            self.run_operation("upload", record=False)
+        resp = self.request("battles", "GET", "/battles", record=False)
+        if resp is not None:
+            self.battle_ids.extend(b["id"] for b in resp.json().get("battles", []))
+        logging.info(f"[loadtest] seeded; {len(self.battle_ids)} battles available")
+
+    def calibrate(self, monitor: DBMonitor, requests_per_endpoint: int) -> dict:
+        """
+        Issue each endpoint alone and measure how many DB connections one request opens.
+        Runs before the timed phase since the global counter can't be attributed under a mix.
+        """
+        per_request = {}
+        if not monitor.db:
+            return per_request
+        for endpoint in self.mix:
+            before = monitor.connections_opened()
+            for _ in range(requests_per_endpoint):
+                self.run_operation(endpoint, record=False)
+            after = monitor.connections_opened()
+            per_request[endpoint] = round((after - before) / requests_per_endpoint, 2)
+        return per_request
+
+    def worker(self, deadline: float):
+        endpoints = list(self.mix)
+        weights = list(self.mix.values())
+        while time.monotonic() < deadline:
+            self.run_operation(random.choices(endpoints, weights)[0])
+
+    def run(self, duration: float, concurrency: int) -> float:
+        deadline = time.monotonic() + duration
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(self.worker, deadline) for _ in range(concurrency)]
+        # Re-raise anything that killed a worker instead of silently
+        # reporting lower throughput
+        for future in futures:
+            future.result()
+        return time.monotonic() - start
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def build_report(recorder: Recorder, elapsed: float, connections_per_request: dict, db_stats: dict) -> dict:
+    endpoints = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        errors = recorder.errors[endpoint]
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0,
+            "error_rate": round(errors / len(values), 4) if values else 0,
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p90_ms": round(percentile(values, 90) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1) if values else 0,
+            "db_connections_per_request": connections_per_request.get(endpoint),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "elapsed_s": round(elapsed, 1),
+        "total_requests": total,
+        "total_throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+        "endpoints": endpoints,
+        "db": db_stats,
+    }
+
+
+def print_report(report: dict):
+    header = f"{'endpoint':<10}{'reqs':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'db/req':>8}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, e in report["endpoints"].items():
+        conns = e["db_connections_per_request"]
+        print(
+            f"{endpoint:<10}{e['requests']:>8}{e['throughput_rps']:>9}{e['error_rate'] * 100:>7.1f}"
+            f"{e['p50_ms']:>9}{e['p90_ms']:>9}{e['p99_ms']:>9}{e['max_ms']:>9}"
+            f"{conns if conns is not None else '-':>8}"
+        )
+    print("-" * len(header))
+    print(f"total: {report['total_requests']} requests in {report['elapsed_s']}s "
+          f"({report['total_throughput_rps']} req/s)")
+    if report["db"]:
+        print(f"db threads connected: avg {report['db']['threads_connected_avg']}, "
+              f"peak {report['db']['threads_connected_peak']}")
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(
+                f"unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})"
+            )
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight for '{name}': {weight}")
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        raise argparse.ArgumentTypeError("the mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def start_app(port: int, workers: int) -> subprocess.Popen:
+    """Start uvicorn on `port` from this directory and wait until it answers."""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    url = f"http://127.0.0.1:{port}/clans"
+    for _ in range(120):
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            requests.get(url, timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not become ready in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the WoT shooting stats API.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start-app", action="store_true", help="Start uvicorn locally for the run.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when using --start-app.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run the timed phase.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent simulated clients.")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weighted endpoint mix (default: {DEFAULT_MIX}).")
+    parser.add_argument("--seed-uploads", type=int, default=10, help="Replays to upload before the timed phase.")
+    parser.add_argument("--players", type=int, default=300, help="Size of the synthetic player pool.")
+    parser.add_argument("--clans", type=int, default=10, help="Number of synthetic clans.")
+    parser.add_argument("--calibrate", type=int, default=5,
+                        help="Requests per endpoint for the DB-connections calibration pass (0 to skip).")
+    parser.add_argument("--random-seed", type=int, default=None)
+    parser.add_argument("--json", help="Also write the report to this path.")
+    args = parser.parse_args()
+
+    random.seed(args.random_seed)
+    proc = None
+    base_url = args.base_url
+    if args.start_app:
+        proc = start_app(args.port, args.workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        factory = ReplayFactory(args.players, args.clans, args.random_seed)
+        test = LoadTest(base_url, factory, args.mix)
+        test.seed(args.seed_uploads)
+
+        monitor = DBMonitor()
+        connections_per_request = test.calibrate(monitor, args.calibrate) if args.calibrate else {}
+
+        logging.info(f"[loadtest] running {args.duration}s at concurrency {args.concurrency}")
+        monitor.start()
+        elapsed = test.run(args.duration, args.concurrency)
+        db_stats = monitor.stop()
+
+        report = build_report(test.recorder, elapsed, connections_per_request, db_stats)
+        print_report(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 import os
 import logging
+from datetime import date
+from typing import Literal
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from replay_parser import parse_replay
 from repository import *
 from utils.vehicle_lookup import VehicleLookup
 from utils.map_lookup import MapLookup
+from utils.trend import TrendCache, compute_trend
+from utils.responses import FastJSONResponse, NDJSONResponse
 
 load_dotenv()
 
@@ -15,6 +20,8 @@ WOT_API_KEY = os.getenv("WOT_API_KEY", "b257be4e7c58952fc322990fe39c72fa")
 VEHICLE_CACHE_PATH = os.getenv("VEHICLE_CACHE_PATH", "utils/vehicles.json")
 MAP_CACHE_PATH = os.getenv("MAP_CACHE_PATH", "utils/maps_cache.json")
 TEMP_UPLOAD_DIR = os.getenv("TEMP_UPLOAD_DIR", "/tmp")
+# Responses smaller than this many bytes are sent uncompressed
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
 CORS_ORIGINS = [
     o.strip().rstrip("/")
     for o in os.getenv("CORS_ORIGINS", "*").split(",")
@@ -41,7 +48,7 @@ logging.info(f"[CORS] ORIGINS: {CORS_ORIGINS}")
 logging.info(f"[CORS] ORIGIN_REGEX: {CORS_ORIGIN_REGEX}")
 logging.info(f"[CORS] ALLOW_CREDENTIALS: {CORS_ALLOW_CREDENTIALS}")
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 lookup = VehicleLookup()
 lookup.refresh_from_api(WOT_API_KEY)
 lookup = VehicleLookup(VEHICLE_CACHE_PATH)
@@ -49,7 +56,13 @@ lookup = VehicleLookup(VEHICLE_CACHE_PATH)
 map_lookup = MapLookup()
 map_lookup.refresh_from_api(WOT_API_KEY)
 
-# Configure CORS with explicit origins or regex for preview domains
+# Per-process LRU cache of /users/{account_id}/trend results, keyed on the
+# player's stats_version so ingests in any worker invalidate it
+TREND_CACHE_SIZE = int(os.getenv("TREND_CACHE_SIZE", "1024"))
+trend_cache = TrendCache(TREND_CACHE_SIZE)
+
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 # Configure CORS with explicit origins or regex for preview domains
 app.add_middleware(
     CORSMiddleware,
@@ -79,9 +92,11 @@ async def upload_replay(file: UploadFile = File(...), battle_name: str = Form("B
     common_data = data["common"]
     battle_timestamp = common_data.get("arenaCreateTime")
     battle_name_effective = derived_battle_name or battle_name or "Battle"
-    battle_id = create_battle(battle_name_effective, battle_timestamp)
+    battle_time = to_battle_time(battle_timestamp)
+    battle_id = create_battle(battle_name_effective, battle_time)
 
     stats_list = []
+    player_stats = []
 
     for acc_id, player in data["players"].items():
         clan_id = player.get("clanDBID")
@@ -105,26 +120,23 @@ async def upload_replay(file: UploadFile = File(...), battle_name: str = Form("B
                 hits = vehicle.get("directHits", 0)
                 pens = vehicle.get("piercings", 0)
                 damage = vehicle.get("damageDealt", 0)
+
+                player_stats.append({
+                    "account_id": int(acc_id),
+                    "clan_id": clan_id,
+                    "vehicle_type": type_descr,
+                    "team": player.get("team"),
+                    "shots": shots,
+                    "hits": hits,
+                    "penetrations": pens,
+                    "damage_dealt": damage
+                })
+
+                # Ratios are only derived for the response; the DB stores raw counters
                 accuracy = round((hits / shots) * 100, 2) if shots else 0
                 pen_rate = round((pens / hits) * 100, 2) if hits else 0
                 pen_ratio = round((pens / shots) * 100, 2) if shots else 0
 
-                insert_player_stats(
-                    battle_id,
-                    int(acc_id),
-                    type_descr,
-                    player.get("team"),
-                    {
-                        "shots": shots,
-                        "hits": hits,
-                        "penetrations": pens,
-                        "damage_dealt": damage,
-                        "accuracy": accuracy,
-                        "penetration_rate": pen_rate,
-                        "pen_to_shot_ratio": pen_ratio
-                    }
-                )
-
                 # Add to stats list for response
                 stats_list.append({
                     "battleStartTime": common_data["arenaCreateTime"],
@@ -143,19 +155,24 @@ async def upload_replay(file: UploadFile = File(...), battle_name: str = Form("B
                     "playerName": metadata.get("playerName"),
                 })
 
+    # All stats rows and their rollups are written in a single transaction
+    insert_battle_stats(battle_id, battle_time, player_stats)
+
     return {"battle_id": battle_id, "metadata": metadata, "stats": stats_list}
 
 @app.get("/battles")
-async def get_battles():
-    """Fetch all uploaded battles."""
+def get_battles(output_format: Literal["json", "ndjson"] = Query("json", alias="format")):
+    """Fetch all uploaded battles. Pass `format=ndjson` to stream one battle per line."""
+    if output_format == "ndjson":
+        return NDJSONResponse(iter_all_battles())
     battles = get_all_battles()
-    return {"battles": battles}
+    return FastJSONResponse({"battles": battles})
 
 @app.get("/battles/{battle_id}")
 async def get_battle_details(battle_id: int):
     """Fetch stats for a specific battle."""
     result = get_battle_stats(battle_id)
-    return {"battle_id": battle_id, "stats": result["players"], "team_averages": result["team_averages"]}
+    return FastJSONResponse({"battle_id": battle_id, "stats": result["players"], "team_averages": result["team_averages"]})
 
 
 @app.delete("/battles/{battle_id}")
@@ -195,16 +212,56 @@ async def update_battle_endpoint(battle_id: int, battle_name: str):
 
 
 @app.get("/users")
-async def get_users(start_date: str = None, end_date: str = None):
-    """Fetch all users with their battle counts."""
+def get_users(
+    start_date: date | None = None,
+    end_date: date | None = None,
+    output_format: Literal["json", "ndjson"] = Query("json", alias="format"),
+):
+    """Fetch all users with their battle counts. Pass `format=ndjson` to stream one user per line."""
+    if output_format == "ndjson":
+        return NDJSONResponse(iter_all_users(start_date, end_date))
     users = get_all_users(start_date, end_date)
-    return {"users": users}
+    return FastJSONResponse({"users": users})
 
 
 @app.get("/users/{account_id}")
-async def get_user_stats(account_id: int, start_date: str = None, end_date: str = None):
+async def get_user_stats(account_id: int, start_date: date | None = None, end_date: date | None = None):
     """Fetch aggregated stats for a specific user across all battles."""
     stats = get_user_aggregated_stats(account_id, start_date, end_date)
     if not stats:
         return {"status": "not_found", "message": f"User {account_id} not found or has no stats."}
-    return {"account_id": account_id, "stats": stats}
+    return FastJSONResponse({"account_id": account_id, "stats": stats})
+
+
+@app.get("/users/{account_id}/trend")
+async def get_user_trend(account_id: int):
+    """Fetch rolling-window and daily/weekly shooting trends for a user."""
+    not_found = {"status": "not_found", "message": f"User {account_id} not found or has no stats."}
+    version = get_user_stats_version(account_id)
+    if version is None:
+        return not_found
+    trend = trend_cache.get(account_id, version)
+    if trend is None:
+        trend = compute_trend(get_user_battle_counters(account_id))
+        if not trend["total_battles"]:
+            return not_found
+        # Tagged with the version read before the counters: if an ingest lands
+        # in between, the next request sees a newer version and recomputes
+        trend_cache.set(account_id, version, trend)
+    return FastJSONResponse({"account_id": account_id, "trend": trend})
+
+
+@app.get("/clans")
+async def get_clans(start_date: date | None = None, end_date: date | None = None):
+    """Fetch all clans with their overall shooting stats."""
+    clans = get_all_clans(start_date, end_date)
+    return FastJSONResponse({"clans": clans})
+
+
+@app.get("/clans/{clan_id}")
+async def get_clan_stats(clan_id: int, start_date: date | None = None, end_date: date | None = None):
+    """Fetch a clan's shooting stats with per-member and per-vehicle breakdowns."""
+    stats = get_clan_aggregated_stats(clan_id, start_date, end_date)
+    if not stats:
+        return {"status": "not_found", "message": f"Clan {clan_id} not found."}
+    return FastJSONResponse({"clan_id": clan_id, "stats": stats})
@@ -0,0 +1,46 @@
+"""Database maintenance commands for the stats tables.
+
+Usage:
+    python maintenance.py ensure [--months-ahead N]   # run from cron or at deploy
+    python maintenance.py archive --before YYYY-MM-DD
+"""
+import argparse
+import logging
+from datetime import date
+from repository import ensure_stats_partitions, archive_stats_partitions
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain player_battle_stats partitions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure", help="Create upcoming monthly partitions.")
+    ensure.add_argument("--months-ahead", type=int, default=3)
+
+    archive = commands.add_parser("archive", help="Move cold partitions into the archive table.")
+    archive.add_argument(
+        "--before",
+        type=date.fromisoformat,
+        required=True,
+        help="Archive partitions whose range ends on or before this date.",
+    )
+
+    args = parser.parse_args()
+    if args.command == "ensure":
+        created = ensure_stats_partitions(args.months_ahead)
+        logging.info(f"[partitions] created: {created or 'none'}")
+    elif args.command == "archive":
+        try:
+            archived = archive_stats_partitions(args.before)
+        except ValueError as e:
+            parser.error(str(e))
+        for name, rows in archived.items():
+            logging.info(f"[partitions] archived {name}: {rows} rows")
+        if not archived:
+            logging.info("[partitions] nothing to archive")
+
+
+if __name__ == "__main__":
+    main()
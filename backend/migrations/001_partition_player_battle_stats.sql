@@ -0,0 +1,108 @@
+-- Migrates an existing database to the time-partitioned stats layout in
+-- schema.sql. Run once, then `python maintenance.py ensure` to create the
+-- monthly partitions covering existing data.
+USE wot_stats;
+
+ALTER TABLE battles
+    ADD COLUMN player_count INT NOT NULL DEFAULT 0,
+    ADD INDEX (created_at);
+
+UPDATE battles b
+SET b.player_count = (
+    SELECT COUNT(DISTINCT pbs.account_id)
+    FROM player_battle_stats pbs
+    WHERE pbs.battle_id = b.id
+);
+
+CREATE TABLE player_battle_stats_new (
+    id BIGINT AUTO_INCREMENT,
+    battle_id BIGINT NOT NULL,
+    battle_time DATETIME NOT NULL,
+    account_id BIGINT,
+    vehicle_type INT,
+    team TINYINT,
+
+    shots INT,
+    hits INT,
+    penetrations INT,
+    damage_dealt INT,
+
+    accuracy DECIMAL(5,2),
+    penetration_rate DECIMAL(5,2),
+    pen_to_shot_ratio DECIMAL(5,2),
+
+    PRIMARY KEY (id, battle_time),
+    INDEX (account_id, battle_time),
+    INDEX (battle_id)
+)
+PARTITION BY RANGE COLUMNS (battle_time) (
+    PARTITION p_old VALUES LESS THAN ('2024-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+
+INSERT INTO player_battle_stats_new (
+    id, battle_id, battle_time, account_id, vehicle_type, team,
+    shots, hits, penetrations, damage_dealt,
+    accuracy, penetration_rate, pen_to_shot_ratio
+)
+SELECT
+    pbs.id, pbs.battle_id, b.created_at, pbs.account_id, pbs.vehicle_type, pbs.team,
+    pbs.shots, pbs.hits, pbs.penetrations, pbs.damage_dealt,
+    pbs.accuracy, pbs.penetration_rate, pbs.pen_to_shot_ratio
+FROM player_battle_stats pbs
+JOIN battles b ON pbs.battle_id = b.id;
+
+RENAME TABLE player_battle_stats TO player_battle_stats_old,
+             player_battle_stats_new TO player_battle_stats;
+DROP TABLE player_battle_stats_old;
+
+CREATE TABLE player_battle_stats_archive (
+    id BIGINT NOT NULL,
+    battle_id BIGINT NOT NULL,
+    battle_time DATETIME NOT NULL,
+    account_id BIGINT,
+    vehicle_type INT,
+    team TINYINT,
+
+    shots INT,
+    hits INT,
+    penetrations INT,
+    damage_dealt INT,
+
+    accuracy DECIMAL(5,2),
+    penetration_rate DECIMAL(5,2),
+    pen_to_shot_ratio DECIMAL(5,2),
+
+    PRIMARY KEY (id, battle_time),
+    INDEX (battle_id)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+CREATE TABLE player_daily_stats (
+    account_id BIGINT NOT NULL,
+    vehicle_type INT NOT NULL,
+    stat_date DATE NOT NULL,
+
+    battles INT NOT NULL DEFAULT 0,
+    shots INT NOT NULL DEFAULT 0,
+    hits INT NOT NULL DEFAULT 0,
+    penetrations INT NOT NULL DEFAULT 0,
+    damage_dealt BIGINT NOT NULL DEFAULT 0,
+
+    sum_accuracy DECIMAL(12,2) NOT NULL DEFAULT 0,
+    sum_penetration_rate DECIMAL(12,2) NOT NULL DEFAULT 0,
+    sum_pen_to_shot_ratio DECIMAL(12,2) NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (account_id, stat_date, vehicle_type)
+);
+
+INSERT INTO player_daily_stats (
+    account_id, vehicle_type, stat_date,
+    battles, shots, hits, penetrations, damage_dealt,
+    sum_accuracy, sum_penetration_rate, sum_pen_to_shot_ratio
+)
+SELECT
+    account_id, vehicle_type, DATE(battle_time),
+    COUNT(*), SUM(shots), SUM(hits), SUM(penetrations), SUM(damage_dealt),
+    SUM(accuracy), SUM(penetration_rate), SUM(pen_to_shot_ratio)
+FROM player_battle_stats
+GROUP BY account_id, vehicle_type, DATE(battle_time);
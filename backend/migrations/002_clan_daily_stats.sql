@@ -0,0 +1,46 @@
+-- Adds the clan rollups used by /clans. Backfills from live stats rows,
+-- attributing each row to the player's current clan.
+USE wot_stats;
+
+ALTER TABLE player_battle_stats ADD COLUMN clan_id BIGINT AFTER account_id;
+ALTER TABLE player_battle_stats_archive ADD COLUMN clan_id BIGINT AFTER account_id;
+
+UPDATE player_battle_stats pbs
+JOIN users u ON pbs.account_id = u.account_id
+SET pbs.clan_id = u.clan_id;
+
+UPDATE player_battle_stats_archive pbs
+JOIN users u ON pbs.account_id = u.account_id
+SET pbs.clan_id = u.clan_id;
+
+CREATE TABLE clan_daily_stats (
+    clan_id BIGINT NOT NULL,
+    stat_date DATE NOT NULL,
+    account_id BIGINT NOT NULL,
+    vehicle_type INT NOT NULL,
+
+    battles INT NOT NULL DEFAULT 0,
+    shots INT NOT NULL DEFAULT 0,
+    hits INT NOT NULL DEFAULT 0,
+    penetrations INT NOT NULL DEFAULT 0,
+    damage_dealt BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (clan_id, stat_date, account_id, vehicle_type)
+);
+
+INSERT INTO clan_daily_stats (
+    clan_id, stat_date, account_id, vehicle_type,
+    battles, shots, hits, penetrations, damage_dealt
+)
+SELECT
+    clan_id, DATE(battle_time), account_id, vehicle_type,
+    COUNT(*), SUM(shots), SUM(hits), SUM(penetrations), SUM(damage_dealt)
+FROM (
+    SELECT clan_id, battle_time, account_id, vehicle_type, shots, hits, penetrations, damage_dealt
+    FROM player_battle_stats
+    UNION ALL
+    SELECT clan_id, battle_time, account_id, vehicle_type, shots, hits, penetrations, damage_dealt
+    FROM player_battle_stats_archive
+) pbs
+WHERE clan_id IS NOT NULL
+GROUP BY clan_id, DATE(battle_time), account_id, vehicle_type;
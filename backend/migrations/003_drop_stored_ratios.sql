@@ -0,0 +1,18 @@
+-- Ratios are now derived from the raw counters at read time, so the stored
+-- (rounded) percentage columns are dropped.
+USE wot_stats;
+
+ALTER TABLE player_battle_stats
+    DROP COLUMN accuracy,
+    DROP COLUMN penetration_rate,
+    DROP COLUMN pen_to_shot_ratio;
+
+ALTER TABLE player_battle_stats_archive
+    DROP COLUMN accuracy,
+    DROP COLUMN penetration_rate,
+    DROP COLUMN pen_to_shot_ratio;
+
+ALTER TABLE player_daily_stats
+    DROP COLUMN sum_accuracy,
+    DROP COLUMN sum_penetration_rate,
+    DROP COLUMN sum_pen_to_shot_ratio;
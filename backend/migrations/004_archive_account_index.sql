@@ -0,0 +1,4 @@
+-- Lets /users/{account_id}/trend read a player's archived battles by index.
+USE wot_stats;
+
+ALTER TABLE player_battle_stats_archive ADD INDEX (account_id, battle_time);
@@ -0,0 +1,5 @@
+-- Version counter bumped on every ingest/delete touching a player's stats;
+-- /users/{account_id}/trend keys its cache on it.
+USE wot_stats;
+
+ALTER TABLE users ADD COLUMN stats_version BIGINT NOT NULL DEFAULT 0;
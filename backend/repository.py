@@ -1,5 +1,33 @@
+from datetime import date, datetime, timedelta
 from db import get_db
 
+STATS_TABLE = "player_battle_stats"
+STATS_ARCHIVE_TABLE = "player_battle_stats_archive"
+STATS_COLUMNS = """
+    id, battle_id, battle_time, account_id, clan_id, vehicle_type, team,
+    shots, hits, penetrations, damage_dealt
+"""
+
+
+def _date_filter(column, start_date=None, end_date=None):
+    """Build an ` AND ...` range filter on `column` plus its params.
+
+    `start_date` and `end_date` are `date`s (validated by the endpoints).
+    Both bounds are whole days and the range is half-open,
+    `[start_date, end_date + 1 day)`, so the daily rollups and the raw
+    `battle_time` rows select exactly the same battles.
+    """
+    sql = ""
+    params = []
+    if start_date:
+        sql += f" AND {column} >= %s"
+        params.append(start_date)
+    if end_date:
+        sql += f" AND {column} < %s"
+        params.append(end_date + timedelta(days=1))
+    return sql, params
+
+
 def upsert_clan(clan_id, tag=None, name=None):
     """Insert or ignore clan entry."""
     if not clan_id:
@@ -32,65 +60,160 @@ def upsert_vehicle(type_comp_descr, name):
         VALUES (%s,%s)
     """, (type_comp_descr, name))
 
-def create_battle(battle_name="Battle", battle_timestamp=None):
-    """Create a new battle with given name."""
+def to_battle_time(battle_timestamp=None):
+    """Convert a replay's Unix timestamp to the datetime stored for the battle."""
+    if battle_timestamp:
+        return datetime.fromtimestamp(battle_timestamp)
+    return datetime.now().replace(microsecond=0)
+
+def create_battle(battle_name="Battle", battle_time=None):
+    """Create a new battle with given name and start time."""
     db = get_db()
     cur = db.cursor()
-    if battle_timestamp:
-        # Convert Unix timestamp to MySQL TIMESTAMP format
-        from datetime import datetime
-        dt = datetime.fromtimestamp(battle_timestamp)
+    cur.execute(
+        "INSERT INTO battles (battle_name, created_at) VALUES (%s, %s)",
+        (battle_name, battle_time or to_battle_time())
+    )
+    return cur.lastrowid
+
+def insert_battle_stats(battle_id, battle_time, player_stats):
+    """Insert all players' stats rows for a battle and fold them into the rollups.
+
+    `player_stats` is a list of dicts with `account_id`, `clan_id`,
+    `vehicle_type`, `team`, `shots`, `hits`, `penetrations` and
+    `damage_dealt`. `battle_time` is denormalized from the battle so the rows
+    land in the right monthly partition; `clan_id` is the player's clan in
+    this battle and selects the clan rollup the row is counted towards.
+
+    Everything is written in one transaction: the rollups are the only source
+    of totals once raw rows are archived, so they must never drift.
+    """
+    if not player_stats:
+        return
+    stat_date = battle_time.date()
+    db = get_db()
+    cur = db.cursor()
+    try:
+        db.start_transaction()
+        cur.executemany("""
+            INSERT INTO player_battle_stats (
+                battle_id, battle_time, account_id, clan_id, vehicle_type, team,
+                shots, hits, penetrations, damage_dealt
+            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """, [(
+            battle_id, battle_time, p["account_id"], p["clan_id"], p["vehicle_type"], p["team"],
+            p["shots"], p["hits"], p["penetrations"], p["damage_dealt"]
+        ) for p in player_stats])
+        cur.executemany("""
+            INSERT INTO player_daily_stats (
+                account_id, vehicle_type, stat_date,
+                battles, shots, hits, penetrations, damage_dealt
+            ) VALUES (%s,%s,%s,1,%s,%s,%s,%s)
+            ON DUPLICATE KEY UPDATE
+                battles = battles + 1,
+                shots = shots + VALUES(shots),
+                hits = hits + VALUES(hits),
+                penetrations = penetrations + VALUES(penetrations),
+                damage_dealt = damage_dealt + VALUES(damage_dealt)
+        """, [(
+            p["account_id"], p["vehicle_type"], stat_date,
+            p["shots"], p["hits"], p["penetrations"], p["damage_dealt"]
+        ) for p in player_stats])
+        clan_rows = [p for p in player_stats if p["clan_id"]]
+        if clan_rows:
+            cur.executemany("""
+                INSERT INTO clan_daily_stats (
+                    clan_id, stat_date, account_id, vehicle_type,
+                    battles, shots, hits, penetrations, damage_dealt
+                ) VALUES (%s,%s,%s,%s,1,%s,%s,%s,%s)
+                ON DUPLICATE KEY UPDATE
+                    battles = battles + 1,
+                    shots = shots + VALUES(shots),
+                    hits = hits + VALUES(hits),
+                    penetrations = penetrations + VALUES(penetrations),
+                    damage_dealt = damage_dealt + VALUES(damage_dealt)
+            """, [(
+                p["clan_id"], stat_date, p["account_id"], p["vehicle_type"],
+                p["shots"], p["hits"], p["penetrations"], p["damage_dealt"]
+            ) for p in clan_rows])
         cur.execute(
-            "INSERT INTO battles (battle_name, created_at) VALUES (%s, %s)",
-            (battle_name, dt)
+            "UPDATE battles SET player_count = player_count + %s WHERE id = %s",
+            (len(player_stats), battle_id)
         )
-    else:
+        account_ids = sorted({p["account_id"] for p in player_stats})
         cur.execute(
-            "INSERT INTO battles (battle_name) VALUES (%s)",
-            (battle_name,)
+            f"UPDATE users SET stats_version = stats_version + 1 "
+            f"WHERE account_id IN ({', '.join(['%s'] * len(account_ids))})",
+            account_ids
         )
-    return cur.lastrowid
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def _stream_rows(query, params=(), batch_size=1000):
+    """Yield result rows as dicts, fetching `batch_size` at a time.
 
-def insert_player_stats(battle_id, account_id, vehicle_type, team, stats):
+    Uses an unbuffered cursor so large listings never sit fully in memory.
+    """
     db = get_db()
-    cur = db.cursor()
-    cur.execute("""
-        INSERT INTO player_battle_stats (
-            battle_id, account_id, vehicle_type, team,
-            shots, hits, penetrations, damage_dealt,
-            accuracy, penetration_rate, pen_to_shot_ratio
-        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-    """, (
-        battle_id, account_id, vehicle_type, team,
-        stats["shots"], stats["hits"], stats["penetrations"],
-        stats["damage_dealt"], stats["accuracy"],
-        stats["penetration_rate"], stats["pen_to_shot_ratio"]
-    ))
+    try:
+        cur = db.cursor(dictionary=True)
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        # Close only the connection: if the client went away mid-stream the
+        # cursor still has unread rows, and closing it first raises
+        # "Unread result found" before the connection is released
+        db.close()
+
+def iter_all_battles():
+    """Stream all battles with name and timestamp info."""
+    return _stream_rows("""
+        SELECT id, battle_name, created_at, player_count
+        FROM battles
+        ORDER BY created_at DESC
+    """)
 
 def get_all_battles():
     """Fetch all battles with name and timestamp info."""
-    db = get_db()
-    cur = db.cursor(dictionary=True)
-    cur.execute("""
-        SELECT 
-            b.id,
-            b.battle_name,
-            b.created_at,
-            COUNT(DISTINCT pbs.account_id) as player_count
-        FROM battles b
-        LEFT JOIN player_battle_stats pbs ON b.id = pbs.battle_id
-        GROUP BY b.id, b.battle_name, b.created_at
-        ORDER BY b.created_at DESC
-    """)
-    return cur.fetchall()
+    return list(iter_all_battles())
+
+def _battle_stats_source(cur, battle_id):
+    """Return a derived-table SQL fragment and params for one battle's stats rows.
+
+    The live table is filtered on `battle_id` plus a day either side of the
+    battle's `created_at`, so at most two partitions are read. An exact match
+    is not safe: `created_at` is a TIMESTAMP converted through the session
+    time zone while `battle_time` is a DATETIME stored as-is. Archived rows
+    are looked up by `battle_id` in the archive table.
+    """
+    cur.execute("SELECT created_at FROM battles WHERE id = %s", (battle_id,))
+    row = cur.fetchone()
+    created_at = row["created_at"] if row else datetime.now()
+    sql = f"""(
+        SELECT {STATS_COLUMNS} FROM {STATS_TABLE}
+        WHERE battle_id = %s AND battle_time BETWEEN %s AND %s
+        UNION ALL
+        SELECT {STATS_COLUMNS} FROM {STATS_ARCHIVE_TABLE}
+        WHERE battle_id = %s
+    )"""
+    return sql, [
+        battle_id, created_at - timedelta(days=1), created_at + timedelta(days=1), battle_id
+    ]
 
 def get_battle_stats(battle_id):
     """Fetch stats for a specific battle with player and clan info."""
     db = get_db()
     cur = db.cursor(dictionary=True)
+    source, source_params = _battle_stats_source(cur, battle_id)
     
     # Get player stats
-    cur.execute("""
+    cur.execute(f"""
         SELECT 
             u.name,
             pbs.team,
@@ -100,31 +223,29 @@ def get_battle_stats(battle_id):
             pbs.hits,
             pbs.penetrations,
             pbs.damage_dealt as damageDealt,
-            pbs.accuracy,
-            pbs.penetration_rate as penetrationRate,
-            pbs.pen_to_shot_ratio as penToShotRatio,
+            COALESCE(ROUND(pbs.hits * 100.0 / NULLIF(pbs.shots, 0), 2), 0) as accuracy,
+            COALESCE(ROUND(pbs.penetrations * 100.0 / NULLIF(pbs.hits, 0), 2), 0) as penetrationRate,
+            COALESCE(ROUND(pbs.penetrations * 100.0 / NULLIF(pbs.shots, 0), 2), 0) as penToShotRatio,
             u.personal_rating as personalRating
-        FROM player_battle_stats pbs
+        FROM {source} pbs
         JOIN users u ON pbs.account_id = u.account_id
         LEFT JOIN clans c ON u.clan_id = c.id
         JOIN vehicles v ON pbs.vehicle_type = v.type_comp_descr
-        WHERE pbs.battle_id = %s
         ORDER BY u.name ASC
-    """, (battle_id,))
+    """, source_params)
     player_stats = cur.fetchall()
     
-    # Get team averages
-    cur.execute("""
+    # Get team averages, weighted by shots and hits
+    cur.execute(f"""
         SELECT 
             pbs.team,
-            ROUND(AVG(pbs.accuracy), 2) as avg_accuracy,
-            ROUND(AVG(pbs.penetration_rate), 2) as avg_penetration_rate,
-            ROUND(AVG(pbs.pen_to_shot_ratio), 2) as avg_pen_to_shot_ratio,
+            COALESCE(ROUND(SUM(pbs.hits) * 100.0 / NULLIF(SUM(pbs.shots), 0), 2), 0) as accuracy,
+            COALESCE(ROUND(SUM(pbs.penetrations) * 100.0 / NULLIF(SUM(pbs.hits), 0), 2), 0) as penetration_rate,
+            COALESCE(ROUND(SUM(pbs.penetrations) * 100.0 / NULLIF(SUM(pbs.shots), 0), 2), 0) as pen_to_shot_ratio,
             COUNT(*) as player_count
-        FROM player_battle_stats pbs
-        WHERE pbs.battle_id = %s
+        FROM {source} pbs
         GROUP BY pbs.team
-    """, (battle_id,))
+    """, source_params)
     team_averages = cur.fetchall()
     
     return {
@@ -136,21 +257,104 @@ def get_battle_stats(battle_id):
 def delete_battle(battle_id):
     """Delete a battle and its associated player stats.
 
-    This removes rows from `player_battle_stats` for the given
-    `battle_id` and then removes the `battles` row. Returns a
-    dict with counts of deleted rows.
+    The battle's rows are first subtracted from `player_daily_stats` and
+    `clan_daily_stats`, then removed from `player_battle_stats` (and the
+    archive, for cold battles) before the `battles` row itself, all in one
+    transaction. Returns a dict with counts of deleted rows.
     """
     db = get_db()
     cur = db.cursor()
-    # Delete player stats first to avoid foreign key constraint errors
-    cur.execute("DELETE FROM player_battle_stats WHERE battle_id = %s", (battle_id,))
-    stats_deleted = cur.rowcount
-    cur.execute("DELETE FROM battles WHERE id = %s", (battle_id,))
-    battles_deleted = cur.rowcount
-    db.commit()
+    try:
+        db.start_transaction()
+        stats_deleted, battles_deleted = _delete_battle_rows(cur, battle_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     return {"player_stats_deleted": stats_deleted, "battles_deleted": battles_deleted}
 
 
+def _delete_battle_rows(cur, battle_id):
+    """Run the rollup subtraction and deletes for `delete_battle` on `cur`."""
+    stats_deleted = 0
+    for table in (STATS_TABLE, STATS_ARCHIVE_TABLE):
+        cur.execute(f"""
+            UPDATE users u
+            JOIN (SELECT DISTINCT account_id FROM {table} WHERE battle_id = %s) d
+                ON u.account_id = d.account_id
+            SET u.stats_version = u.stats_version + 1
+        """, (battle_id,))
+        cur.execute(f"""
+            UPDATE player_daily_stats r
+            JOIN (
+                SELECT
+                    account_id, vehicle_type, DATE(battle_time) as stat_date,
+                    COUNT(*) as battles, SUM(shots) as shots, SUM(hits) as hits,
+                    SUM(penetrations) as penetrations, SUM(damage_dealt) as damage_dealt
+                FROM {table}
+                WHERE battle_id = %s
+                GROUP BY account_id, vehicle_type, DATE(battle_time)
+            ) d ON r.account_id = d.account_id
+                AND r.vehicle_type = d.vehicle_type
+                AND r.stat_date = d.stat_date
+            SET
+                r.battles = r.battles - d.battles,
+                r.shots = r.shots - d.shots,
+                r.hits = r.hits - d.hits,
+                r.penetrations = r.penetrations - d.penetrations,
+                r.damage_dealt = r.damage_dealt - d.damage_dealt
+        """, (battle_id,))
+        cur.execute(f"""
+            UPDATE clan_daily_stats r
+            JOIN (
+                SELECT
+                    clan_id, account_id, vehicle_type, DATE(battle_time) as stat_date,
+                    COUNT(*) as battles, SUM(shots) as shots, SUM(hits) as hits,
+                    SUM(penetrations) as penetrations, SUM(damage_dealt) as damage_dealt
+                FROM {table}
+                WHERE battle_id = %s AND clan_id IS NOT NULL
+                GROUP BY clan_id, account_id, vehicle_type, DATE(battle_time)
+            ) d ON r.clan_id = d.clan_id
+                AND r.stat_date = d.stat_date
+                AND r.account_id = d.account_id
+                AND r.vehicle_type = d.vehicle_type
+            SET
+                r.battles = r.battles - d.battles,
+                r.shots = r.shots - d.shots,
+                r.hits = r.hits - d.hits,
+                r.penetrations = r.penetrations - d.penetrations,
+                r.damage_dealt = r.damage_dealt - d.damage_dealt
+        """, (battle_id,))
+        # Drop rollup rows the subtraction emptied, so they don't pile up
+        cur.execute(f"""
+            DELETE r FROM player_daily_stats r
+            JOIN (
+                SELECT DISTINCT account_id, vehicle_type, DATE(battle_time) as stat_date
+                FROM {table}
+                WHERE battle_id = %s
+            ) k ON r.account_id = k.account_id
+                AND r.vehicle_type = k.vehicle_type
+                AND r.stat_date = k.stat_date
+            WHERE r.battles <= 0
+        """, (battle_id,))
+        cur.execute(f"""
+            DELETE r FROM clan_daily_stats r
+            JOIN (
+                SELECT DISTINCT clan_id, account_id, vehicle_type, DATE(battle_time) as stat_date
+                FROM {table}
+                WHERE battle_id = %s AND clan_id IS NOT NULL
+            ) k ON r.clan_id = k.clan_id
+                AND r.stat_date = k.stat_date
+                AND r.account_id = k.account_id
+                AND r.vehicle_type = k.vehicle_type
+            WHERE r.battles <= 0
+        """, (battle_id,))
+        cur.execute(f"DELETE FROM {table} WHERE battle_id = %s", (battle_id,))
+        stats_deleted += cur.rowcount
+    cur.execute("DELETE FROM battles WHERE id = %s", (battle_id,))
+    return stats_deleted, cur.rowcount
+
+
 def update_battle_name(battle_id, battle_name):
     """Update a battle's name."""
     db = get_db()
@@ -161,19 +365,12 @@ def update_battle_name(battle_id, battle_name):
     return {"updated": updated}
 
 
-def get_all_users(start_date=None, end_date=None):
-    """Fetch all users with basic info including overall accuracy."""
-    db = get_db()
-    cur = db.cursor(dictionary=True)
-    
-    date_filter = ""
-    params = []
-    if start_date:
-        date_filter += " AND b.created_at >= %s"
-        params.append(start_date)
-    if end_date:
-        date_filter += " AND b.created_at <= %s"
-        params.append(end_date)
+def iter_all_users(start_date=None, end_date=None):
+    """Stream all users with basic info including overall accuracy.
+
+    Served from the daily rollups, so archived battles still count.
+    """
+    date_filter, params = _date_filter("r.stat_date", start_date, end_date)
     
     query = f"""
         SELECT 
@@ -181,33 +378,34 @@ def get_all_users(start_date=None, end_date=None):
             u.name,
             c.tag as clanAbbrev,
             u.personal_rating,
-            COUNT(DISTINCT pbs.battle_id) as battle_count,
-            ROUND(SUM(pbs.hits) * 100.0 / NULLIF(SUM(pbs.shots), 0), 2) as overall_accuracy
+            COALESCE(SUM(r.battles), 0) as battle_count,
+            ROUND(SUM(r.hits) * 100.0 / NULLIF(SUM(r.shots), 0), 2) as overall_accuracy
         FROM users u
         LEFT JOIN clans c ON u.clan_id = c.id
-        LEFT JOIN player_battle_stats pbs ON u.account_id = pbs.account_id
-        LEFT JOIN battles b ON pbs.battle_id = b.id
+        LEFT JOIN player_daily_stats r ON u.account_id = r.account_id AND r.battles > 0
         WHERE 1=1 {date_filter}
         GROUP BY u.account_id, u.name, c.tag, u.personal_rating
         ORDER BY u.name ASC
     """
-    cur.execute(query, params)
-    return cur.fetchall()
+    return _stream_rows(query, params)
+
+
+def get_all_users(start_date=None, end_date=None):
+    """Fetch all users with basic info including overall accuracy."""
+    return list(iter_all_users(start_date, end_date))
 
 
 def get_user_aggregated_stats(account_id, start_date=None, end_date=None):
-    """Fetch aggregated stats for a user across all battles."""
+    """Fetch aggregated stats for a user across all battles.
+
+    Totals and per-vehicle stats come from the daily rollups; the per-battle
+    history reads raw rows with a `battle_time` range so only the matching
+    partitions are scanned, and does not include archived battles.
+    """
     db = get_db()
     cur = db.cursor(dictionary=True)
     
-    date_filter = ""
-    params = [account_id]
-    if start_date:
-        date_filter += " AND b.created_at >= %s"
-        params.append(start_date)
-    if end_date:
-        date_filter += " AND b.created_at <= %s"
-        params.append(end_date)
+    rollup_filter, rollup_params = _date_filter("r.stat_date", start_date, end_date)
     
     # Get overall aggregated stats
     query = f"""
@@ -216,64 +414,49 @@ def get_user_aggregated_stats(account_id, start_date=None, end_date=None):
             u.account_id,
             c.tag as clanAbbrev,
             u.personal_rating,
-            COUNT(DISTINCT pbs.battle_id) as total_battles,
-            SUM(pbs.shots) as total_shots,
-            SUM(pbs.hits) as total_hits,
-            SUM(pbs.penetrations) as total_penetrations,
-            SUM(pbs.damage_dealt) as total_damage,
-            ROUND(AVG(pbs.accuracy), 2) as avg_accuracy,
-            ROUND(AVG(pbs.penetration_rate), 2) as avg_penetration_rate,
-            ROUND(AVG(pbs.pen_to_shot_ratio), 2) as avg_pen_to_shot_ratio,
-            ROUND(SUM(pbs.hits) * 100.0 / NULLIF(SUM(pbs.shots), 0), 2) as overall_accuracy,
-            ROUND(SUM(pbs.penetrations) * 100.0 / NULLIF(SUM(pbs.hits), 0), 2) as overall_pen_rate,
-            ROUND(SUM(pbs.penetrations) * 100.0 / NULLIF(SUM(pbs.shots), 0), 2) as overall_pen_ratio
+            SUM(r.battles) as total_battles,
+            SUM(r.shots) as total_shots,
+            SUM(r.hits) as total_hits,
+            SUM(r.penetrations) as total_penetrations,
+            SUM(r.damage_dealt) as total_damage,
+            ROUND(SUM(r.hits) * 100.0 / NULLIF(SUM(r.shots), 0), 2) as overall_accuracy,
+            ROUND(SUM(r.penetrations) * 100.0 / NULLIF(SUM(r.hits), 0), 2) as overall_pen_rate,
+            ROUND(SUM(r.penetrations) * 100.0 / NULLIF(SUM(r.shots), 0), 2) as overall_pen_ratio
         FROM users u
         LEFT JOIN clans c ON u.clan_id = c.id
-        JOIN player_battle_stats pbs ON u.account_id = pbs.account_id
-        JOIN battles b ON pbs.battle_id = b.id
-        WHERE u.account_id = %s {date_filter}
+        JOIN player_daily_stats r ON u.account_id = r.account_id
+        WHERE u.account_id = %s AND r.battles > 0 {rollup_filter}
         GROUP BY u.account_id, u.name, c.tag, u.personal_rating
     """
-    cur.execute(query, params)
+    cur.execute(query, [account_id] + rollup_params)
     overall = cur.fetchone()
     
     if not overall:
         return None
     
     # Get per-vehicle stats
-    vehicle_params = [account_id]
-    if start_date:
-        vehicle_params.append(start_date)
-    if end_date:
-        vehicle_params.append(end_date)
-    
     vehicle_query = f"""
         SELECT 
             v.name as vehicle_name,
-            COUNT(DISTINCT pbs.battle_id) as battles,
-            SUM(pbs.shots) as shots,
-            SUM(pbs.hits) as hits,
-            SUM(pbs.penetrations) as penetrations,
-            SUM(pbs.damage_dealt) as damage,
-            ROUND(SUM(pbs.hits) * 100.0 / NULLIF(SUM(pbs.shots), 0), 2) as accuracy,
-            ROUND(SUM(pbs.penetrations) * 100.0 / NULLIF(SUM(pbs.hits), 0), 2) as pen_rate,
-            ROUND(SUM(pbs.penetrations) * 100.0 / NULLIF(SUM(pbs.shots), 0), 2) as pen_ratio
-        FROM player_battle_stats pbs
-        JOIN vehicles v ON pbs.vehicle_type = v.type_comp_descr
-        JOIN battles b ON pbs.battle_id = b.id
-        WHERE pbs.account_id = %s {date_filter}
-        GROUP BY v.name, pbs.vehicle_type
+            SUM(r.battles) as battles,
+            SUM(r.shots) as shots,
+            SUM(r.hits) as hits,
+            SUM(r.penetrations) as penetrations,
+            SUM(r.damage_dealt) as damage,
+            ROUND(SUM(r.hits) * 100.0 / NULLIF(SUM(r.shots), 0), 2) as accuracy,
+            ROUND(SUM(r.penetrations) * 100.0 / NULLIF(SUM(r.hits), 0), 2) as pen_rate,
+            ROUND(SUM(r.penetrations) * 100.0 / NULLIF(SUM(r.shots), 0), 2) as pen_ratio
+        FROM player_daily_stats r
+        JOIN vehicles v ON r.vehicle_type = v.type_comp_descr
+        WHERE r.account_id = %s AND r.battles > 0 {rollup_filter}
+        GROUP BY v.name, r.vehicle_type
         ORDER BY battles DESC, damage DESC
     """
-    cur.execute(vehicle_query, vehicle_params)
+    cur.execute(vehicle_query, [account_id] + rollup_params)
     per_vehicle = cur.fetchall()
     
     # Get per-battle details
-    battle_params = [account_id]
-    if start_date:
-        battle_params.append(start_date)
-    if end_date:
-        battle_params.append(end_date)
+    battle_filter, battle_params = _date_filter("pbs.battle_time", start_date, end_date)
     
     battle_query = f"""
         SELECT 
@@ -286,18 +469,18 @@ def get_user_aggregated_stats(account_id, start_date=None, end_date=None):
             pbs.hits,
             pbs.penetrations,
             pbs.damage_dealt as damage,
-            pbs.accuracy,
-            pbs.penetration_rate as pen_rate,
-            pbs.pen_to_shot_ratio as pen_ratio,
+            COALESCE(ROUND(pbs.hits * 100.0 / NULLIF(pbs.shots, 0), 2), 0) as accuracy,
+            COALESCE(ROUND(pbs.penetrations * 100.0 / NULLIF(pbs.hits, 0), 2), 0) as pen_rate,
+            COALESCE(ROUND(pbs.penetrations * 100.0 / NULLIF(pbs.shots, 0), 2), 0) as pen_ratio,
             u.personal_rating
         FROM player_battle_stats pbs
         JOIN battles b ON pbs.battle_id = b.id
         JOIN vehicles v ON pbs.vehicle_type = v.type_comp_descr
         JOIN users u ON pbs.account_id = u.account_id
-        WHERE pbs.account_id = %s {date_filter}
-        ORDER BY b.created_at DESC
+        WHERE pbs.account_id = %s {battle_filter}
+        ORDER BY pbs.battle_time DESC
     """
-    cur.execute(battle_query, battle_params)
+    cur.execute(battle_query, [account_id] + battle_params)
     per_battle = cur.fetchall()
     
     return {
@@ -305,3 +488,241 @@ def get_user_aggregated_stats(account_id, start_date=None, end_date=None):
         "per_vehicle": per_vehicle,
         "per_battle": per_battle
     }
+
+
+def get_user_stats_version(account_id):
+    """Fetch the user's `stats_version`, or None if the user does not exist."""
+    db = get_db()
+    cur = db.cursor()
+    cur.execute("SELECT stats_version FROM users WHERE account_id = %s", (account_id,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def get_user_battle_counters(account_id):
+    """Fetch a user's raw counters for every battle, live and archived, oldest first.
+
+    Returns `(battle_time, shots, hits, penetrations, damage_dealt)` tuples.
+    """
+    db = get_db()
+    cur = db.cursor()
+    cur.execute(f"""
+        SELECT battle_time, shots, hits, penetrations, damage_dealt
+        FROM {STATS_TABLE}
+        WHERE account_id = %s
+        UNION ALL
+        SELECT battle_time, shots, hits, penetrations, damage_dealt
+        FROM {STATS_ARCHIVE_TABLE}
+        WHERE account_id = %s
+        ORDER BY battle_time ASC
+    """, (account_id, account_id))
+    return cur.fetchall()
+
+
+CLAN_TOTALS = """
+    SUM(r.battles) as battles,
+    SUM(r.shots) as shots,
+    SUM(r.hits) as hits,
+    SUM(r.penetrations) as penetrations,
+    SUM(r.damage_dealt) as damage,
+    ROUND(SUM(r.hits) * 100.0 / NULLIF(SUM(r.shots), 0), 2) as accuracy,
+    ROUND(SUM(r.penetrations) * 100.0 / NULLIF(SUM(r.hits), 0), 2) as pen_rate,
+    ROUND(SUM(r.penetrations) * 100.0 / NULLIF(SUM(r.shots), 0), 2) as pen_ratio,
+    ROUND(SUM(r.damage_dealt) / NULLIF(SUM(r.battles), 0), 0) as damage_per_battle
+"""
+
+
+def get_all_clans(start_date=None, end_date=None):
+    """Fetch all clans with their overall shooting stats from the clan rollups.
+
+    Clans without battles in the date range are still listed, with empty stats.
+    """
+    db = get_db()
+    cur = db.cursor(dictionary=True)
+    
+    date_filter, params = _date_filter("r.stat_date", start_date, end_date)
+    
+    query = f"""
+        SELECT 
+            c.id as clan_id,
+            c.tag,
+            c.name,
+            COUNT(DISTINCT r.account_id) as active_members,
+            {CLAN_TOTALS}
+        FROM clans c
+        LEFT JOIN clan_daily_stats r ON c.id = r.clan_id AND r.battles > 0 {date_filter}
+        GROUP BY c.id, c.tag, c.name
+        ORDER BY c.tag ASC
+    """
+    cur.execute(query, params)
+    return cur.fetchall()
+
+
+def get_clan_aggregated_stats(clan_id, start_date=None, end_date=None):
+    """Fetch a clan's shooting stats with per-member and per-vehicle breakdowns.
+
+    All three reads are grouped primary-key range scans of the clan's
+    `clan_daily_stats` rows; no raw stats rows are touched.
+    """
+    db = get_db()
+    cur = db.cursor(dictionary=True)
+    
+    cur.execute("SELECT id as clan_id, tag, name FROM clans WHERE id = %s", (clan_id,))
+    clan = cur.fetchone()
+    if not clan:
+        return None
+    
+    date_filter, params = _date_filter("r.stat_date", start_date, end_date)
+    clan_params = [clan_id] + params
+    
+    # Get overall clan stats
+    cur.execute(f"""
+        SELECT 
+            COUNT(DISTINCT r.account_id) as active_members,
+            {CLAN_TOTALS}
+        FROM clan_daily_stats r
+        WHERE r.clan_id = %s AND r.battles > 0 {date_filter}
+    """, clan_params)
+    overall = cur.fetchone()
+    
+    # Get per-member stats
+    cur.execute(f"""
+        SELECT 
+            r.account_id,
+            u.name,
+            {CLAN_TOTALS}
+        FROM clan_daily_stats r
+        LEFT JOIN users u ON r.account_id = u.account_id
+        WHERE r.clan_id = %s AND r.battles > 0 {date_filter}
+        GROUP BY r.account_id, u.name
+        ORDER BY battles DESC, damage DESC
+    """, clan_params)
+    per_member = cur.fetchall()
+    
+    # Get per-vehicle stats
+    cur.execute(f"""
+        SELECT 
+            r.vehicle_type,
+            v.name as vehicle_name,
+            {CLAN_TOTALS}
+        FROM clan_daily_stats r
+        LEFT JOIN vehicles v ON r.vehicle_type = v.type_comp_descr
+        WHERE r.clan_id = %s AND r.battles > 0 {date_filter}
+        GROUP BY r.vehicle_type, v.name
+        ORDER BY battles DESC, damage DESC
+    """, clan_params)
+    per_vehicle = cur.fetchall()
+    
+    return {
+        "clan": clan,
+        "overall": overall,
+        "per_member": per_member,
+        "per_vehicle": per_vehicle,
+    }
+
+
+def _month_start(d, offset=0):
+    """First day of the month `offset` months after `d`'s month."""
+    months = d.year * 12 + d.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _stats_partitions(cur):
+    """List `(name, upper_bound)` for the stats table's partitions, oldest first.
+
+    `upper_bound` is a `date`, or None for the MAXVALUE partition.
+    """
+    cur.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (STATS_TABLE,))
+    partitions = []
+    for name, description in cur.fetchall():
+        if description == "MAXVALUE":
+            partitions.append((name, None))
+        else:
+            partitions.append((name, date.fromisoformat(description.strip("'")[:10])))
+    return partitions
+
+
+def ensure_stats_partitions(months_ahead=3):
+    """Split monthly partitions off `p_future` up to `months_ahead` past today.
+
+    Returns the names of the partitions that were created.
+    """
+    db = get_db()
+    cur = db.cursor()
+    bounds = [bound for _, bound in _stats_partitions(cur) if bound]
+    month = max(bounds) if bounds else _month_start(date.today())
+    last = _month_start(date.today(), months_ahead + 1)
+    created = []
+    definitions = []
+    while month < last:
+        name = f"p{month:%Y%m}"
+        definitions.append(
+            f"PARTITION {name} VALUES LESS THAN ('{_month_start(month, 1).isoformat()}')"
+        )
+        created.append(name)
+        month = _month_start(month, 1)
+    if definitions:
+        definitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+        cur.execute(
+            f"ALTER TABLE {STATS_TABLE} REORGANIZE PARTITION p_future INTO ({', '.join(definitions)})"
+        )
+    return created
+
+
+def archive_stats_partitions(before):
+    """Move every partition that ends on or before `before` into the archive table.
+
+    Each partition is handled under `LOCK TABLES ... WRITE` on the live and
+    archive tables: rows are copied into the compressed archive table, and
+    the partition is dropped only once every one of its rows is found in the
+    archive. Uploads of old replays that target the partition wait for the
+    lock and then land in the next partition, so none are dropped.
+    `player_daily_stats` is left untouched so totals are unchanged. `before`
+    may not be later than the start of the current month. Returns a dict of
+    archived partition name to row count.
+    """
+    if before > _month_start(date.today()):
+        raise ValueError(
+            f"Refusing to archive partitions ending after {_month_start(date.today())}: "
+            "the current month is still being written."
+        )
+    db = get_db()
+    cur = db.cursor()
+    archived = {}
+    for name, bound in _stats_partitions(cur):
+        if bound is None or bound > before:
+            break
+        cur.execute(f"LOCK TABLES {STATS_TABLE} WRITE, {STATS_ARCHIVE_TABLE} WRITE")
+        try:
+            cur.execute(f"SELECT COUNT(*) FROM {STATS_TABLE} PARTITION ({name})")
+            (expected,) = cur.fetchone()
+            # Plain insert so conversion errors surface; the no-op update only
+            # lets a rerun after a failed drop skip rows that were already copied
+            cur.execute(f"""
+                INSERT INTO {STATS_ARCHIVE_TABLE} ({STATS_COLUMNS})
+                SELECT {STATS_COLUMNS} FROM {STATS_TABLE} PARTITION ({name})
+                ON DUPLICATE KEY UPDATE id = {STATS_ARCHIVE_TABLE}.id
+            """)
+            # No aliases: under LOCK TABLES every alias would need its own lock
+            cur.execute(f"""
+                SELECT COUNT(*)
+                FROM {STATS_TABLE} PARTITION ({name})
+                JOIN {STATS_ARCHIVE_TABLE}
+                    ON {STATS_ARCHIVE_TABLE}.id = {STATS_TABLE}.id
+                    AND {STATS_ARCHIVE_TABLE}.battle_time = {STATS_TABLE}.battle_time
+            """)
+            (copied,) = cur.fetchone()
+            if copied != expected:
+                raise RuntimeError(
+                    f"Archive copy of partition {name} holds {copied} of {expected} rows; not dropping it."
+                )
+            cur.execute(f"ALTER TABLE {STATS_TABLE} DROP PARTITION {name}")
+        finally:
+            cur.execute("UNLOCK TABLES")
+        archived[name] = expected
+    return archived
@@ -13,6 +13,8 @@ CREATE TABLE users (
     account_id BIGINT PRIMARY KEY,
     name VARCHAR(255),
     clan_id BIGINT,
+    -- Bumped whenever the player's stats rows change; keys cached trends
+    stats_version BIGINT NOT NULL DEFAULT 0,
     FOREIGN KEY (clan_id) REFERENCES clans(id) ON DELETE SET NULL
 );
 
@@ -26,14 +28,27 @@ CREATE TABLE vehicles (
 CREATE TABLE battles (
     id BIGINT AUTO_INCREMENT PRIMARY KEY,
     battle_name VARCHAR(255) DEFAULT 'Battle',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    player_count INT NOT NULL DEFAULT 0,
+
+    INDEX (created_at)
 );
 
 -- PER PLAYER PER BATTLE STATS
+-- Only raw counters are stored; accuracy and pen ratios are derived from
+-- them (weighted by shots/hits) when rows are read or aggregated.
+-- Range-partitioned by month on the denormalized battle time so date-filtered
+-- reads only touch the relevant partitions. Partitioned InnoDB tables cannot
+-- carry foreign keys, and the partition column must be part of the primary key.
+-- New monthly partitions are split off p_future by `python maintenance.py ensure`,
+-- which the Docker image runs before starting uvicorn; schedule it from cron too
+-- for long-lived deployments (the web app itself never runs partition DDL).
 CREATE TABLE player_battle_stats (
-    id BIGINT AUTO_INCREMENT PRIMARY KEY,
-    battle_id BIGINT,
+    id BIGINT AUTO_INCREMENT,
+    battle_id BIGINT NOT NULL,
+    battle_time DATETIME NOT NULL,
     account_id BIGINT,
+    clan_id BIGINT,
     vehicle_type INT,
     team TINYINT,
 
@@ -42,14 +57,66 @@ CREATE TABLE player_battle_stats (
     penetrations INT,
     damage_dealt INT,
 
-    accuracy DECIMAL(5,2),
-    penetration_rate DECIMAL(5,2),
-    pen_to_shot_ratio DECIMAL(5,2),
+    PRIMARY KEY (id, battle_time),
+    INDEX (account_id, battle_time),
+    INDEX (battle_id)
+)
+PARTITION BY RANGE COLUMNS (battle_time) (
+    PARTITION p_old VALUES LESS THAN ('2024-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
 
-    FOREIGN KEY (battle_id) REFERENCES battles(id),
-    FOREIGN KEY (account_id) REFERENCES users(account_id),
-    FOREIGN KEY (vehicle_type) REFERENCES vehicles(type_comp_descr),
+-- ARCHIVED PER PLAYER PER BATTLE STATS
+-- Cold partitions are moved here by `python maintenance.py archive`.
+CREATE TABLE player_battle_stats_archive (
+    id BIGINT NOT NULL,
+    battle_id BIGINT NOT NULL,
+    battle_time DATETIME NOT NULL,
+    account_id BIGINT,
+    clan_id BIGINT,
+    vehicle_type INT,
+    team TINYINT,
 
-    INDEX (account_id),
+    shots INT,
+    hits INT,
+    penetrations INT,
+    damage_dealt INT,
+
+    PRIMARY KEY (id, battle_time),
+    INDEX (account_id, battle_time),
     INDEX (battle_id)
+) ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;
+
+-- PER PLAYER PER VEHICLE PER DAY ROLLUPS
+-- Maintained on every insert/delete so totals survive archival of raw rows.
+CREATE TABLE player_daily_stats (
+    account_id BIGINT NOT NULL,
+    vehicle_type INT NOT NULL,
+    stat_date DATE NOT NULL,
+
+    battles INT NOT NULL DEFAULT 0,
+    shots INT NOT NULL DEFAULT 0,
+    hits INT NOT NULL DEFAULT 0,
+    penetrations INT NOT NULL DEFAULT 0,
+    damage_dealt BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (account_id, stat_date, vehicle_type)
+);
+
+-- PER CLAN PER MEMBER PER VEHICLE PER DAY ROLLUPS
+-- Keyed by clan first so a clan view over a date range is one primary key
+-- range read. `clan_id` is the player's clan at the time of the battle.
+CREATE TABLE clan_daily_stats (
+    clan_id BIGINT NOT NULL,
+    stat_date DATE NOT NULL,
+    account_id BIGINT NOT NULL,
+    vehicle_type INT NOT NULL,
+
+    battles INT NOT NULL DEFAULT 0,
+    shots INT NOT NULL DEFAULT 0,
+    hits INT NOT NULL DEFAULT 0,
+    penetrations INT NOT NULL DEFAULT 0,
+    damage_dealt BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (clan_id, stat_date, account_id, vehicle_type)
 );
@@ -0,0 +1,39 @@
+from decimal import Decimal
+from typing import Any, Iterable
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+
+
+def _to_native(obj: Any):
+    """
+    orjson fallback for the types MySQL hands back that it can't encode itself.
+    DECIMAL columns and SUM()/ROUND() results arrive as Decimal.
+    """
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes with orjson; datetimes are emitted as ISO 8601."""
+    return orjson.dumps(content, default=_to_native, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson.
+    Returning it directly from an endpoint also skips FastAPI's jsonable_encoder pass.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class NDJSONResponse(StreamingResponse):
+    """Streams an iterable of rows as newline-delimited JSON, one row per line."""
+    media_type = "application/x-ndjson"
+
+    def __init__(self, rows: Iterable, **kwargs):
+        super().__init__((dumps(row) + b"\n" for row in rows), **kwargs)
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from datetime import timedelta
+from itertools import accumulate
+
+
+def _ratios(battles: int, shots: int, hits: int, pens: int, damage: int) -> dict:
+    """Derive the shooting ratios for a span of battles from its counter totals."""
+    return {
+        "battles": battles,
+        "accuracy": round(hits * 100.0 / shots, 2) if shots else None,
+        "pen_rate": round(pens * 100.0 / hits, 2) if hits else None,
+        "pen_ratio": round(pens * 100.0 / shots, 2) if shots else None,
+        "damage_per_battle": round(damage / battles) if battles else None,
+    }
+
+
+def _buckets(rows: list, bucket_start, limit: int) -> list:
+    """Group time-ordered rows into consecutive buckets and keep the last `limit`."""
+    buckets = []
+    current = None
+    for battle_time, shots, hits, pens, damage in rows:
+        start = bucket_start(battle_time.date())
+        if current is None or current[0] != start:
+            current = [start, 0, 0, 0, 0, 0]
+            buckets.append(current)
+        current[1] += 1
+        current[2] += shots or 0
+        current[3] += hits or 0
+        current[4] += pens or 0
+        current[5] += damage or 0
+    return [
+        {"start": start.isoformat(), **_ratios(b, s, h, p, d)}
+        for start, b, s, h, p, d in buckets[-limit:]
+    ]
+
+
+def compute_trend(rows: list, windows=(10, 50, 100), points: int = 100,
+                  days: int = 30, weeks: int = 26) -> dict:
+    """
+    Build rolling-window and calendar-bucket series for one player's battles.
+    :param rows: (battle_time, shots, hits, penetrations, damage) tuples, oldest first
+    :param windows: rolling window sizes, in battles
+    :param points: maximum number of samples returned per rolling series
+    :param days: number of most recent daily buckets to return
+    :param weeks: number of most recent weekly buckets to return
+    :return: dict whose size depends only on the parameters, not on the history length
+    """
+    n = len(rows)
+    # Prefix sums over the counters: any window total is a difference of two entries
+    prefix = [
+        [0] + list(accumulate(row[col] or 0 for row in rows))
+        for col in (1, 2, 3, 4)
+    ]
+
+    def window_totals(end: int, size: int) -> dict:
+        start = max(0, end - size)
+        shots, hits, pens, damage = (p[end] - p[start] for p in prefix)
+        return _ratios(end - start, shots, hits, pens, damage)
+
+    # Sample evenly, always ending on the latest battle
+    step = max(1, -(-n // points))
+    sample_ends = list(range(n, 0, -step))[::-1]
+
+    rolling = {}
+    for size in windows:
+        series = []
+        for end in sample_ends:
+            totals = window_totals(end, size)
+            totals["battle_index"] = end
+            totals["created_at"] = rows[end - 1][0]
+            series.append(totals)
+        rolling[str(size)] = {"latest": window_totals(n, size), "series": series}
+
+    return {
+        "total_battles": n,
+        "rolling": rolling,
+        "daily": _buckets(rows, lambda d: d, days),
+        "weekly": _buckets(rows, lambda d: d - timedelta(days=d.weekday()), weeks),
+    }
+
+
+class TrendCache:
+    def __init__(self, max_entries: int = 1024):
+        """
+        In-process LRU cache of computed trends keyed by account id.
+        Each entry is tagged with the player's `stats_version` from the DB, so
+        an ingest or delete handled by any worker or replica invalidates it.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, account_id: int, version: int):
+        """Return the cached trend if it was computed at `version`, else None."""
+        entry = self.entries.get(account_id)
+        if entry is None or entry[0] != version:
+            return None
+        self.entries.move_to_end(account_id)
+        return entry[1]
+
+    def set(self, account_id: int, version: int, trend: dict):
+        self.entries[account_id] = (version, trend)
+        self.entries.move_to_end(account_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
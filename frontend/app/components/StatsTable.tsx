@@ -27,9 +27,9 @@ interface StatsTableProps {
     } | null;
     teamAverages?: Array<{
         team: number;
-        avg_accuracy: number;
-        avg_penetration_rate: number;
-        avg_pen_to_shot_ratio: number;
+        accuracy: number;
+        penetration_rate: number;
+        pen_to_shot_ratio: number;
         player_count: number;
     }>;
 }
@@ -118,21 +118,21 @@ export default function StatsTable({ stats, metadata, teamAverages }: StatsTable
                                 </div>
                                 <div className="grid grid-cols-3 gap-3">
                                     <div>
-                                        <div className="text-xs text-gray-400">Avg Accuracy</div>
-                                        <div className={`text-xl font-bold ${getAccuracyColor(ta.avg_accuracy)}`}>
-                                            {ta.avg_accuracy}%
+                                        <div className="text-xs text-gray-400">Accuracy</div>
+                                        <div className={`text-xl font-bold ${getAccuracyColor(ta.accuracy)}`}>
+                                            {ta.accuracy}%
                                         </div>
                                     </div>
                                     <div>
-                                        <div className="text-xs text-gray-400">Avg Pen Rate</div>
-                                        <div className={`text-xl font-bold ${getAccuracyColor(ta.avg_penetration_rate)}`}>
-                                            {ta.avg_penetration_rate}%
+                                        <div className="text-xs text-gray-400">Pen Rate</div>
+                                        <div className={`text-xl font-bold ${getAccuracyColor(ta.penetration_rate)}`}>
+                                            {ta.penetration_rate}%
                                         </div>
                                     </div>
                                     <div>
-                                        <div className="text-xs text-gray-400">Avg Pen/Shot</div>
-                                        <div className={`text-xl font-bold ${getAccuracyColor(ta.avg_pen_to_shot_ratio)}`}>
-                                            {ta.avg_pen_to_shot_ratio}%
+                                        <div className="text-xs text-gray-400">Pen/Shot</div>
+                                        <div className={`text-xl font-bold ${getAccuracyColor(ta.pen_to_shot_ratio)}`}>
+                                            {ta.pen_to_shot_ratio}%
                                         </div>
                                     </div>
                                 </div>
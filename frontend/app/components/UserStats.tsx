@@ -18,9 +18,6 @@ interface OverallStats {
     total_hits: number;
     total_penetrations: number;
     total_damage: number;
-    avg_accuracy: number;
-    avg_penetration_rate: number;
-    avg_pen_to_shot_ratio: number;
     overall_accuracy: number;
     overall_pen_rate: number;
     overall_pen_ratio: number;
@@ -209,7 +206,6 @@ export default function UserStats({ accountId, onClose, startDate, endDate }: Us
                                 value={`${stats.overall.overall_pen_ratio}%`}
                                 color={getPenRatioColor(stats.overall.overall_pen_ratio)}
                             />
-                            <StatCard label="Avg Accuracy (per battle)" value={`${stats.overall.avg_accuracy}%`} />
                         </div>
                     )}
 